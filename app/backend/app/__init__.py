@@ -1,7 +1,14 @@
+import os
 from pathlib import Path
 from dotenv import load_dotenv
 
-# Load .env located in the backend directory (app/backend/.env)
-env_path = Path(__file__).resolve().parents[1] / ".env"
-if env_path.exists():
-    load_dotenv(env_path)
\ No newline at end of file
+# Load .env once per process, before any module reads configuration from os.environ:
+# app/backend/.env first, then app/.env (the file the README documents). Neither
+# overrides real environment variables, so the backend file wins over app/.env.
+# The env flag also covers re-imports in worker processes that inherit the environment.
+if not os.environ.get("_ENV_LOADED"):
+    _this_file = Path(__file__).resolve()
+    for env_path in (_this_file.parents[1] / ".env", _this_file.parents[2] / ".env"):
+        if env_path.is_file():
+            load_dotenv(env_path, override=False)
+    os.environ["_ENV_LOADED"] = "1"
@@ -1,30 +1,28 @@
 from __future__ import annotations
 
+import hashlib
 import os
 import re
+import secrets
 import threading
 import time
-import uuid
-from collections import defaultdict, deque
+from collections import OrderedDict, defaultdict, deque
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Tuple
+from typing import Any, Optional, Tuple
 
 import jwt
-from dotenv import load_dotenv
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jwt.exceptions import InvalidTokenError
 from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
 from pydantic import BaseModel, EmailStr
-from sqlalchemy import or_
+from sqlalchemy import bindparam, delete, or_, select
 from sqlalchemy.orm import Session
 
 from app.db.models import RefreshToken as DBRefreshToken
 from app.db.models import User as DBUser
-from app.db.session import get_db
-
-# Load .env from backend root if present
-load_dotenv()
+from app.db.session import get_db, get_db_with_commit
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 
@@ -32,8 +30,14 @@ if not SECRET_KEY:
     raise RuntimeError("SECRET_KEY environment variable is required")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+_ACCESS_TTL = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+_ACCESS_TTL_SECONDS = int(_ACCESS_TTL.total_seconds())
 # How long refresh tokens are valid (in days). Adjust as needed.
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+# Dead refresh tokens are deleted periodically: revoked ones right away, expired ones
+# after a grace period. An interval of 0 disables the background sweep.
+REFRESH_TOKEN_SWEEP_INTERVAL_SECONDS = int(os.getenv("REFRESH_TOKEN_SWEEP_INTERVAL_SECONDS", "3600"))
+REFRESH_TOKEN_EXPIRED_RETENTION_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRED_RETENTION_DAYS", "7"))
 
 AUTH_COOKIE_NAME = os.getenv("AUTH_COOKIE_NAME", "recipe_access_token")
 REFRESH_COOKIE_NAME = os.getenv("REFRESH_COOKIE_NAME", "recipe_refresh_token")
@@ -54,7 +58,31 @@ SIGNUP_LIMIT_WINDOW_SECONDS = int(os.getenv("RATE_LIMIT_SIGNUP_WINDOW_SECONDS",
 REFRESH_LIMIT_COUNT = int(os.getenv("RATE_LIMIT_REFRESH_COUNT", "40"))
 REFRESH_LIMIT_WINDOW_SECONDS = int(os.getenv("RATE_LIMIT_REFRESH_WINDOW_SECONDS", "60"))
 
-password_hash = PasswordHash.recommended()
+# Short-lived in-process caches for verified access tokens and the users they resolve to.
+# Keeps chatty clients (polling frontends) from paying JWT decode + a DB lookup per request.
+# Set AUTH_CACHE_TTL_SECONDS=0 to disable.
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "5"))
+AUTH_CACHE_MAXSIZE = int(os.getenv("AUTH_CACHE_MAXSIZE", "4096"))
+# Usernames never change, so their ids can be remembered much longer.
+USER_ID_CACHE_TTL_SECONDS = float(os.getenv("USER_ID_CACHE_TTL_SECONDS", "300"))
+
+# Argon2 cost parameters. Defaults match argon2-cffi's (what PasswordHash.recommended()
+# used), but are pinned here so a package upgrade cannot silently change login latency.
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+# Expected upper bound for a single verify; the startup self-check warns above it.
+PASSWORD_VERIFY_TARGET_MS = float(os.getenv("PASSWORD_VERIFY_TARGET_MS", "250"))
+
+password_hash = PasswordHash(
+    (
+        Argon2Hasher(
+            time_cost=ARGON2_TIME_COST,
+            memory_cost=ARGON2_MEMORY_COST,
+            parallelism=ARGON2_PARALLELISM,
+        ),
+    )
+)
 
 
 def validate_password_strength(password: str) -> Tuple[bool, str]:
@@ -82,6 +110,10 @@ def validate_password_strength(password: str) -> Tuple[bool, str]:
         return False, "Password must contain at least one number"
     return True, ""
 
+# Reused PyJWT instance; `require` makes decode itself reject tokens missing these claims.
+_jwt = jwt.PyJWT()
+_JWT_DECODE_OPTIONS = {"require": ["exp", "sub", "iat"], "verify_signature": True}
+
 # OAuth2 scheme: token endpoint will be /auth/token (router prefix below provides /auth)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
@@ -91,6 +123,56 @@ _rate_limit_events: dict[str, deque[float]] = defaultdict(deque)
 _rate_limit_lock = threading.Lock()
 
 
+class _TTLCache:
+    """Small thread-safe TTL cache with LRU eviction once `maxsize` is reached."""
+
+    def __init__(self, maxsize: int, ttl_seconds: float) -> None:
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._items: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        if self.ttl_seconds <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= now:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        if self.ttl_seconds <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+# raw access token -> decoded JWT payload
+_token_cache = _TTLCache(AUTH_CACHE_MAXSIZE, AUTH_CACHE_TTL_SECONDS)
+# username -> public `User` model
+_user_cache = _TTLCache(AUTH_CACHE_MAXSIZE, AUTH_CACHE_TTL_SECONDS)
+# username -> users.id
+_user_id_cache = _TTLCache(AUTH_CACHE_MAXSIZE, USER_ID_CACHE_TTL_SECONDS)
+
+
 # --- Pydantic models exposed by the router ---------------------------------
 class Token(BaseModel):
     access_token: str
@@ -101,6 +183,12 @@ class Token(BaseModel):
     expires_in: Optional[int] = None
 
 
+class RefreshBody(BaseModel):
+    """Optional JSON body for /refresh and /logout; the HttpOnly cookie is the fallback."""
+
+    refresh_token: Optional[str] = None
+
+
 class TokenData(BaseModel):
     username: Optional[str] = None
 
@@ -131,10 +219,6 @@ class UserUpdate(BaseModel):
     new_password: Optional[str] = None
 
 
-class UserInDB(User):
-    hashed_password: str
-
-
 def _rate_limit_or_raise(request: Request, scope: str, limit: int, window_seconds: int) -> None:
     """Simple in-memory sliding-window limiter by client IP and scope."""
     client_ip = request.client.host if request.client and request.client.host else "unknown"
@@ -252,119 +336,169 @@ def get_password_hash(password: str) -> str:
     return password_hash.hash(password)
 
 
+# Verified against when the login user does not exist, so unknown and known usernames
+# cost the same Argon2 work and cannot be told apart by response time.
+_DUMMY_HASH = get_password_hash("\x00dummy\x00")
+
+
+def measure_password_verify_ms() -> float:
+    """Time one `verify_password` call with the configured Argon2 parameters."""
+    started = time.perf_counter()
+    verify_password("benchmark-password", _DUMMY_HASH)
+    return (time.perf_counter() - started) * 1000
+
+
 # --- DB-backed user helpers -----------------------------------------------
-def get_user(db: Session, username_or_email: str) -> Optional[UserInDB]:
-    """Load user from DB by username or email and return a Pydantic `UserInDB` or None."""
+# Built once at import: this lookup runs on every login and every uncached
+# authenticated request, so skip per-call Query construction.
+_select_user_by_username_or_email = select(DBUser).where(
+    or_(
+        DBUser.username == bindparam("username_or_email"),
+        DBUser.email == bindparam("username_or_email"),
+    )
+)
+
+
+def get_user(db: Session, username_or_email: str) -> Optional[DBUser]:
+    """Load the DB user by username or email, or return None."""
     # Support login by either username or email. This makes the login form flexible
     # (users can enter their username or email address).
-    db_user = (
-        db.query(DBUser)
-        .filter(
-            or_(
-                DBUser.username == username_or_email,
-                DBUser.email == username_or_email,
-            )
+    # `.first()` rather than `scalar_one_or_none()`: one user's username may equal
+    # another user's email, so two rows can match.
+    return (
+        db.execute(
+            _select_user_by_username_or_email,
+            {"username_or_email": username_or_email},
         )
+        .scalars()
         .first()
     )
-    if db_user is None:
-        return None
-    return UserInDB(
-        username=db_user.username,
-        email=db_user.email,
-        full_name=db_user.full_name,
-        # Map DB is_active -> Pydantic `disabled` (preserve existing semantics)
-        disabled=not bool(getattr(db_user, "is_active", True)),
-        hashed_password=db_user.password_hash,
-    )
 
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[UserInDB]:
-    """Verify username/password against the DB user record."""
-    user = get_user(db, username)
-    if not user:
+_select_user_id_by_username = select(DBUser.id).where(DBUser.username == bindparam("username"))
+
+
+def get_user_id(db: Session, username: str) -> Optional[str]:
+    """Return the id of the user with this username, or None (memoized per username)."""
+    user_id = _user_id_cache.get(username)
+    if user_id is None:
+        user_id = db.execute(
+            _select_user_id_by_username, {"username": username}
+        ).scalar_one_or_none()
+        if user_id is not None:
+            _user_id_cache.set(username, user_id)
+    return user_id
+
+
+def authenticate_user(db: Session, username: str, password: str) -> Optional[DBUser]:
+    """Verify username/password and return the matching DB user record."""
+    db_user = get_user(db, username)
+    if not db_user:
+        verify_password(password, _DUMMY_HASH)
         return None
-    if not verify_password(password, user.hashed_password):
+    if not verify_password(password, db_user.password_hash):
         return None
-    return user
+    return db_user
 
 
 # --- JWT token helpers ----------------------------------------------------
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token with an expiration."""
     to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
-    else:
-        expire = datetime.now(timezone.utc) + timedelta(
-            minutes=ACCESS_TOKEN_EXPIRE_MINUTES
-        )
-    to_encode.update({"exp": expire, "iat": datetime.now(timezone.utc)})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    now = datetime.now(timezone.utc)
+    to_encode.update({"exp": now + (expires_delta or _ACCESS_TTL), "iat": now})
+    encoded_jwt = _jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
 # --- Refresh token helpers & Dependencies for routes ----------------------
+def _hash_refresh_token(token_str: str) -> str:
+    """Return the hex SHA-256 digest under which a refresh token is stored."""
+    return hashlib.sha256(token_str.encode()).hexdigest()
+
+
 def _create_refresh_token_record(db: Session, db_user: DBUser) -> str:
     """
-    Create a server-side refresh token record and return a client-facing token.
+    Add a server-side refresh token record to the session and return the client-facing token.
 
-    The database stores only a hash of the secret part. The client receives a composite
-    token in the form: <token_id>.<raw_secret>.
+    The database stores only the SHA-256 digest of the token. The token is a random
+    high-entropy value, so a fast hash is enough and lookups can go through the
+    unique index on the digest column.
+
+    The caller owns the transaction and must commit.
     """
-    raw_secret = uuid.uuid4().hex
-    token_hash = get_password_hash(raw_secret)
+    token_str = secrets.token_urlsafe(32)
     expires_at = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     rt = DBRefreshToken(
         user_id=db_user.id,
-        token=token_hash,
+        token=_hash_refresh_token(token_str),
         expires_at=expires_at,
         revoked=False,
     )
     db.add(rt)
-    db.commit()
-    # refresh the instance so created_at / id are present
-    db.refresh(rt)
-    return f"{rt.id}.{raw_secret}"
+    return token_str
 
 
-def _split_refresh_token(token_str: str) -> tuple[str, str] | None:
-    """Parse <token_id>.<raw_secret> format and return components."""
-    if not token_str or "." not in token_str:
-        return None
-    token_id, raw_secret = token_str.split(".", 1)
-    if not token_id or not raw_secret:
-        return None
-    return token_id, raw_secret
+# Refresh-token lookups are built once at import and executed with bound parameters,
+# skipping per-call Query construction. The `revoked = false` predicate must match
+# the partial `ix_refresh_tokens_active` index so the planner can use it.
+_select_active_refresh_token = select(DBRefreshToken).where(
+    DBRefreshToken.token == bindparam("digest"),
+    DBRefreshToken.revoked == False,  # noqa: E712
+)
+# Same, restricted to unexpired tokens and joined with the owner, so the refresh
+# route needs a single round-trip.
+_select_valid_refresh_token_with_owner = (
+    select(DBRefreshToken, DBUser)
+    .join(DBUser, DBUser.id == DBRefreshToken.user_id)
+    .where(
+        DBRefreshToken.token == bindparam("digest"),
+        DBRefreshToken.revoked == False,  # noqa: E712
+        DBRefreshToken.expires_at > bindparam("now"),
+    )
+)
 
 
 def _revoke_refresh_token(db: Session, token_str: str) -> None:
     """Mark a refresh token as revoked only when presented token is valid."""
-    parts = _split_refresh_token(token_str)
-    if not parts:
-        return
-    token_id, raw_secret = parts
-    rt = db.query(DBRefreshToken).filter(DBRefreshToken.id == token_id).first()
-    if rt and verify_password(raw_secret, rt.token):
+    rt = db.execute(
+        _select_active_refresh_token, {"digest": _hash_refresh_token(token_str)}
+    ).scalar_one_or_none()
+    if rt:
         rt.revoked = True
         db.add(rt)
         db.commit()
 
 
-def _validate_refresh_token(db: Session, token_str: str) -> Optional[DBRefreshToken]:
-    """Return the refresh token DB record if valid (not revoked and not expired), else None."""
-    parts = _split_refresh_token(token_str)
-    if not parts:
-        return None
-    token_id, raw_secret = parts
-    rt = db.query(DBRefreshToken).filter(DBRefreshToken.id == token_id).first()
-    if not rt or rt.revoked:
-        return None
-    if rt.expires_at and rt.expires_at < datetime.now(timezone.utc):
-        return None
-    if not verify_password(raw_secret, rt.token):
+def _validate_refresh_token(
+    db: Session, token_str: str
+) -> Optional[tuple[DBRefreshToken, DBUser]]:
+    """
+    Return the refresh token DB record and its owner if the token is valid
+    (not revoked and not expired), else None.
+    """
+    row = db.execute(
+        _select_valid_refresh_token_with_owner,
+        {"digest": _hash_refresh_token(token_str), "now": datetime.now(timezone.utc)},
+    ).first()
+    if row is None:
         return None
-    return rt
+    return row[0], row[1]
+
+
+def purge_refresh_tokens(db: Session) -> int:
+    """Delete revoked and long-expired refresh tokens; return how many rows were removed."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=REFRESH_TOKEN_EXPIRED_RETENTION_DAYS)
+    result = db.execute(
+        delete(DBRefreshToken).where(
+            or_(
+                DBRefreshToken.revoked == True,  # noqa: E712
+                DBRefreshToken.expires_at < cutoff,
+            )
+        )
+    )
+    db.commit()
+    return result.rowcount
 
 
 async def get_current_user(
@@ -380,28 +514,40 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if username is None:
+    payload = _token_cache.get(token)
+    # A cached payload is only reused while the token itself is still unexpired.
+    if payload is None or payload.get("exp", 0) <= time.time():
+        try:
+            payload = _jwt.decode(
+                token, SECRET_KEY, algorithms=[ALGORITHM], options=_JWT_DECODE_OPTIONS
+            )
+        except InvalidTokenError:
             raise credentials_exception
-        token_data = TokenData(username=username)
-    except InvalidTokenError:
-        raise credentials_exception
+        _token_cache.set(token, payload)
+
+    token_data = TokenData(username=payload["sub"])
 
     if not token_data.username:
         raise credentials_exception
 
-    user_in_db = get_user(db, username_or_email=token_data.username)
-    if user_in_db is None:
+    user = _user_cache.get(token_data.username)
+    if user is not None:
+        return user
+
+    db_user = get_user(db, username_or_email=token_data.username)
+    if db_user is None:
         raise credentials_exception
 
-    return User(
-        username=user_in_db.username,
-        email=user_in_db.email,
-        full_name=user_in_db.full_name,
-        disabled=user_in_db.disabled,
+    user = User(
+        username=db_user.username,
+        email=db_user.email,
+        full_name=db_user.full_name,
+        # Map DB is_active -> Pydantic `disabled`
+        disabled=not bool(getattr(db_user, "is_active", True)),
     )
+    _user_cache.set(token_data.username, user)
+    _user_id_cache.set(db_user.username, db_user.id)
+    return user
 
 
 async def get_current_active_user(
@@ -435,8 +581,8 @@ async def login_for_access_token(
         window_seconds=LOGIN_LIMIT_WINDOW_SECONDS,
     )
 
-    user = authenticate_user(db, form_data.username, form_data.password)
-    if not user:
+    db_user = authenticate_user(db, form_data.username, form_data.password)
+    if not db_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail={
@@ -447,21 +593,20 @@ async def login_for_access_token(
         )
 
     # Make sure the DB user is active
-    db_user = db.query(DBUser).filter(DBUser.username == user.username).first()
-    if not db_user or not getattr(db_user, "is_active", True):
+    if not getattr(db_user, "is_active", True):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail={"message": "Account is disabled", "code": "account_disabled"},
         )
 
     # Create access token
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": db_user.username}, expires_delta=_ACCESS_TTL
     )
 
     # Create and persist a refresh token
     refresh_token_str = _create_refresh_token_record(db, db_user)
+    db.commit()
 
     _set_auth_cookies(response, access_token=access_token, refresh_token=refresh_token_str)
 
@@ -470,7 +615,7 @@ async def login_for_access_token(
         token_type="bearer",
         # Keep refresh token out of JSON responses; it is sent only via HttpOnly cookie.
         refresh_token=None,
-        expires_in=int(access_token_expires.total_seconds()),
+        expires_in=_ACCESS_TTL_SECONDS,
     )
 
 
@@ -478,18 +623,16 @@ async def login_for_access_token(
 async def refresh_access_token(
     request: Request,
     response: Response,
-    payload: dict | None = None,
-    db: Session = Depends(get_db),
+    body: Optional[RefreshBody] = None,
+    db: Session = Depends(get_db_with_commit, scope="function"),
 ):
     """
     Exchange a valid refresh token for a new access token (and rotate the refresh token).
-    Reads refresh token from payload or HttpOnly cookie.
-    
-    Uses optimistic token generation to prevent lockout if response is lost:
-    1. Validate old token
-    2. Create new tokens FIRST
-    3. Then revoke old token
-    This way if the response is lost, the client can retry with the old token.
+    Reads refresh token from the request body or HttpOnly cookie.
+
+    Issuing the new refresh token and revoking the old one happen in a single
+    transaction (committed by `get_db_with_commit` before the response is sent),
+    so the rotation is atomic: either both are persisted or neither is.
     """
     _rate_limit_or_raise(
         request,
@@ -498,9 +641,7 @@ async def refresh_access_token(
         window_seconds=REFRESH_LIMIT_WINDOW_SECONDS,
     )
 
-    token_str = None
-    if isinstance(payload, dict):
-        token_str = payload.get("refresh_token")
+    token_str = body.refresh_token if body else None
     if not token_str:
         token_str = request.cookies.get(REFRESH_COOKIE_NAME)
     if not token_str:
@@ -512,8 +653,8 @@ async def refresh_access_token(
             },
         )
 
-    rt_record = _validate_refresh_token(db, token_str)
-    if not rt_record:
+    validated = _validate_refresh_token(db, token_str)
+    if not validated:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail={
@@ -521,45 +662,43 @@ async def refresh_access_token(
                 "code": "invalid_refresh_token",
             },
         )
+    rt_record, db_user = validated
 
     # Ensure user still active
-    db_user = db.query(DBUser).filter(DBUser.id == rt_record.user_id).first()
-    if not db_user or not getattr(db_user, "is_active", True):
+    if not getattr(db_user, "is_active", True):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail={"message": "Account disabled", "code": "account_disabled"},
         )
 
-    # OPTIMISTIC APPROACH: Create new tokens BEFORE revoking old one
-    # This prevents permanent lockout if the response is lost in transit
     new_refresh = _create_refresh_token_record(db, db_user)
-    
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    rt_record.revoked = True
+
     access_token = create_access_token(
-        data={"sub": db_user.username}, expires_delta=access_token_expires
+        data={"sub": db_user.username}, expires_delta=_ACCESS_TTL
     )
 
-    # Now revoke the old refresh token
-    rt_record.revoked = True
-    db.add(rt_record)
-    db.commit()
-
     _set_auth_cookies(response, access_token=access_token, refresh_token=new_refresh)
 
     return Token(
         access_token=access_token,
         token_type="bearer",
         refresh_token=None,
-        expires_in=int(access_token_expires.total_seconds()),
+        expires_in=_ACCESS_TTL_SECONDS,
     )
 
 
 @router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
-async def logout(request: Request, response: Response, payload: dict | None = None, db: Session = Depends(get_db)):
+async def logout(
+    request: Request,
+    response: Response,
+    body: Optional[RefreshBody] = None,
+    db: Session = Depends(get_db),
+):
     """
     Revoke a refresh token (logout). Payload: { "refresh_token": "<token>" }
     """
-    token_str = (payload or {}).get("refresh_token")
+    token_str = body.refresh_token if body else None
     if not token_str:
         token_str = request.cookies.get(REFRESH_COOKIE_NAME)
     if not token_str:
@@ -571,12 +710,19 @@ async def logout(request: Request, response: Response, payload: dict | None = No
             },
         )
     _revoke_refresh_token(db, token_str)
+    access_token = request.cookies.get(AUTH_COOKIE_NAME)
+    if access_token:
+        _token_cache.pop(access_token)
     _clear_auth_cookies(response)
     return None
 
 
 @router.post("/signup", response_model=User, status_code=status.HTTP_201_CREATED)
-async def signup(request: Request, user_in: UserCreate, db: Session = Depends(get_db)):
+async def signup(
+    request: Request,
+    user_in: UserCreate,
+    db: Session = Depends(get_db_with_commit, scope="function"),
+):
     """
     Register a new user.
 
@@ -598,15 +744,23 @@ async def signup(request: Request, user_in: UserCreate, db: Session = Depends(ge
             detail={"message": error_msg, "code": "weak_password"},
         )
 
-    existing = db.query(DBUser).filter(DBUser.username == user_in.username).first()
-    if existing:
+    # One round-trip for both uniqueness checks; username clashes take precedence.
+    existing = (
+        db.query(DBUser.username, DBUser.email)
+        .filter(
+            or_(
+                DBUser.username == user_in.username,
+                DBUser.email == user_in.email,
+            )
+        )
+        .all()
+    )
+    if any(row.username == user_in.username for row in existing):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"message": "Username already exists", "code": "username_exists"},
         )
-
-    existing_email = db.query(DBUser).filter(DBUser.email == user_in.email).first()
-    if existing_email:
+    if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"message": "Email already registered", "code": "email_exists"},
@@ -621,8 +775,6 @@ async def signup(request: Request, user_in: UserCreate, db: Session = Depends(ge
         is_active=True,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
 
     return User(
         username=db_user.username,
@@ -686,6 +838,8 @@ async def update_users_me(
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    # Drop the cached profile so the next authenticated request sees the update.
+    _user_cache.pop(db_user.username)
 
     return User(
         username=db_user.username,
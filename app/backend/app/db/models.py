@@ -9,10 +9,13 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     ForeignKey,
+    Index,
     String,
     Text,
     UniqueConstraint,
+    desc,
     func,
+    text,
 )
 from sqlalchemy.orm import Mapped, declarative_base, mapped_column, relationship
 
@@ -62,12 +65,18 @@ class User(Base):
         Boolean, nullable=False, server_default="true"
     )
 
+    # Relationships never load implicitly (lazy="raise"): users are fetched on every
+    # authenticated request and must not drag their collections along. Queries that
+    # need them opt in with e.g. `.options(selectinload(User.saved_recipes))`.
+    # passive_deletes lets the FK's ON DELETE CASCADE remove children without loading them.
+
     # Relationship: one user -> many saved recipes
     saved_recipes: Mapped[List["SavedRecipe"]] = relationship(
         "SavedRecipe",
         back_populates="owner",
         cascade="all, delete-orphan",
-        lazy="selectin",
+        passive_deletes=True,
+        lazy="raise",
     )
 
     # Relationship: one user -> many refresh tokens (for session management / token revocation)
@@ -75,7 +84,8 @@ class User(Base):
         "RefreshToken",
         back_populates="user",
         cascade="all, delete-orphan",
-        lazy="selectin",
+        passive_deletes=True,
+        lazy="raise",
     )
 
     def to_dict(self) -> Dict[str, Any]:
@@ -107,17 +117,21 @@ class SavedRecipe(Base):
     """
 
     __tablename__ = "saved_recipes"
-    __table_args__ = (UniqueConstraint("id", name="pk_saved_recipes"),)
+    __table_args__ = (
+        # Serves the per-user list (WHERE user_id = ? ORDER BY created_at DESC) without
+        # a sort step, and plain user_id lookups / FK cascades via its leading column.
+        Index("ix_saved_recipes_user_created", "user_id", desc("created_at")),
+    )
 
-    # Use UUID string ids for saved recipes
+    # Use UUID string ids for saved recipes. The primary key already has a unique
+    # index, so no extra unique constraint / index on `id` (each one costs a write per INSERT).
     id: Mapped[str] = mapped_column(
-        String(36), primary_key=True, index=True, default=lambda: str(uuid.uuid4())
+        String(36), primary_key=True, default=lambda: str(uuid.uuid4())
     )
     user_id: Mapped[str] = mapped_column(
         String(36),
         ForeignKey("users.id", ondelete="CASCADE"),
         nullable=False,
-        index=True,
     )
 
     # Basic searchable fields
@@ -134,9 +148,9 @@ class SavedRecipe(Base):
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
 
-    # Relationship back to owner
+    # Relationship back to owner (explicit loading only, see User)
     owner: Mapped["User"] = relationship(
-        "User", back_populates="saved_recipes", lazy="joined"
+        "User", back_populates="saved_recipes", lazy="raise"
     )
 
     def to_dict(self) -> Dict[str, Any]:
@@ -162,14 +176,25 @@ class RefreshToken(Base):
     Fields:
     - id: primary key
     - user_id: FK to `users.id`
-    - token: the refresh token string (should be stored hashed in production)
+    - token: hex SHA-256 digest of the refresh token (the raw token is never stored)
     - expires_at: when the refresh token expires
     - revoked: whether the token has been revoked
     - created_at: when the token was issued
     """
 
     __tablename__ = "refresh_tokens"
-    __table_args__ = (UniqueConstraint("token", name="uq_refresh_tokens_token"),)
+    __table_args__ = (
+        # Token lookups only ever target live tokens; indexing just those rows keeps the
+        # index small no matter how many revoked tokens accumulate.
+        Index(
+            "ix_refresh_tokens_active",
+            "token",
+            unique=True,
+            postgresql_where=text("revoked = false"),
+        ),
+        # Per-user listing / cleanup of tokens (also serves plain user_id lookups).
+        Index("ix_refresh_tokens_user_active", "user_id", "revoked", "expires_at"),
+    )
 
     # Use UUID strings for token ids and user relationship
     id: Mapped[str] = mapped_column(
@@ -179,12 +204,9 @@ class RefreshToken(Base):
         String(36),
         ForeignKey("users.id", ondelete="CASCADE"),
         nullable=False,
-        index=True,
     )
 
-    token: Mapped[str] = mapped_column(
-        String(255), nullable=False, unique=True, index=True
-    )
+    token: Mapped[str] = mapped_column(String(64), nullable=False)
     expires_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False
     )
@@ -196,9 +218,9 @@ class RefreshToken(Base):
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
 
-    # Relationship back to user
+    # Relationship back to user (explicit loading only, see User)
     user: Mapped["User"] = relationship(
-        "User", back_populates="refresh_tokens", lazy="joined"
+        "User", back_populates="refresh_tokens", lazy="raise"
     )
 
     def to_dict(self) -> Dict[str, Any]:
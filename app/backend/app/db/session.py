@@ -3,7 +3,8 @@
 SQLAlchemy engine & session utilities.
 
 - Uses DATABASE_URL environment variable (falls back to a local sqlite file for development).
-- Exposes `engine`, `SessionLocal` and a `get_db` generator suitable for FastAPI dependencies.
+- Exposes `engine`, `SessionLocal` and `get_db` / `get_db_with_commit` generators suitable
+  for FastAPI dependencies.
 - Provides `create_db` helper to create tables from the SQLAlchemy Base metadata.
 """
 
@@ -13,7 +14,8 @@ import os
 from pathlib import Path
 from typing import Generator, Optional, Union
 
-from dotenv import load_dotenv
+import orjson
+from fastapi import Depends
 from sqlalchemy import create_engine
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session, sessionmaker
@@ -47,7 +49,39 @@ SQLALCHEMY_ECHO = os.getenv("SQLALCHEMY_ECHO", "0") in (
     "YES",
 )
 
-engine: Engine = create_engine(DATABASE_URL, echo=SQLALCHEMY_ECHO, future=True)
+# Connection pool / statement cache tuning (override via env for larger deployments).
+# - pool_pre_ping: transparently replace connections Postgres closed while idle
+# - pool_recycle: proactively recycle connections older than this many seconds
+# - query_cache_size: compiled-SQL cache; sized so the auth / saved-recipe queries never get evicted
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", "1200"))
+
+
+def _json_dumps(value) -> str:
+    """JSON column serializer (orjson; SQLAlchemy expects a str)."""
+    return orjson.dumps(value).decode()
+
+
+def _engine_options(echo: bool) -> dict:
+    """Keyword arguments shared by every engine created in this module."""
+    return {
+        "echo": echo,
+        "future": True,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_pre_ping": True,
+        "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+        "query_cache_size": DB_QUERY_CACHE_SIZE,
+        # JSON columns (saved recipe payloads) are parsed/dumped with orjson
+        # instead of the stdlib json module, including by the psycopg2 driver.
+        "json_serializer": _json_dumps,
+        "json_deserializer": orjson.loads,
+    }
+
+
+engine: Engine = create_engine(DATABASE_URL, **_engine_options(SQLALCHEMY_ECHO))
 
 # Configure a session factory bound to the engine.
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
@@ -73,7 +107,7 @@ def get_engine(
     # Ensure echo is a concrete bool for the create_engine call.
     echo_flag: bool = SQLALCHEMY_ECHO if echo is None else bool(echo)
 
-    return create_engine(url, echo=echo_flag, future=True)
+    return create_engine(url, **_engine_options(echo_flag))
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -93,6 +127,21 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def get_db_with_commit(db: Session = Depends(get_db)) -> Generator[Session, None, None]:
+    """
+    Like `get_db`, but commits once the route returns without raising.
+
+    Declare it with `scope="function"` so the commit happens before the response
+    is sent (a failed commit then surfaces as an error response instead of being
+    lost after the client already got a success):
+        def route(db: Session = Depends(get_db_with_commit, scope="function")): ...
+
+    The session itself is still closed by `get_db` after the response.
+    """
+    yield db
+    db.commit()
+
+
 def create_db(
     engine_or_url: Optional[Union[Engine, str]] = None,
     create_if_not_exists: bool = True,
@@ -1,31 +1,44 @@
 from __future__ import annotations
 
-from contextlib import asynccontextmanager
-import json
+import asyncio
+from contextlib import asynccontextmanager, suppress
 import logging
 import os
+import uuid
 from typing import Any, AsyncIterator, Dict
 
+import orjson
 from fastapi import Depends, FastAPI, HTTPException, Request, status
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, RedirectResponse, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response
 from pydantic import ValidationError
+from sqlalchemy import bindparam, delete, select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
 
+from app.auth import ARGON2_MEMORY_COST
+from app.auth import ARGON2_PARALLELISM
+from app.auth import ARGON2_TIME_COST
+from app.auth import PASSWORD_VERIFY_TARGET_MS
+from app.auth import REFRESH_TOKEN_SWEEP_INTERVAL_SECONDS
 from app.auth import User as AuthUser
 from app.auth import get_current_active_user
+from app.auth import get_user_id
+from app.auth import measure_password_verify_ms
+from app.auth import purge_refresh_tokens
 from app.auth import router as auth_router
 from app.db.models import SavedRecipe as DBSavedRecipe
-from app.db.models import User as DBUser
+from app.db.session import SessionLocal
 from app.db.session import create_db as _create_db
 from app.db.session import get_db
 
 # Use absolute package imports within the backend package so the module can be
 # executed reliably whether started via `uvicorn app.main:app` or as part of a larger project.
-from app.models import ErrorResponse, Recipe, RecipeRequest
+from app.models import ErrorResponse, Recipe, RecipeRequest, SavedRecipeRef
 from app.services import (
     generate_recipe_from_ingredients,
     get_empty_recipes,
@@ -37,6 +50,27 @@ _uvicorn_logger = logging.getLogger("uvicorn.error")
 logger = _uvicorn_logger if _uvicorn_logger.handlers else logging.getLogger(__name__)
 
 
+def _purge_refresh_tokens_once() -> int:
+    db = SessionLocal()
+    try:
+        return purge_refresh_tokens(db)
+    finally:
+        db.close()
+
+
+async def _sweep_refresh_tokens(interval_seconds: int) -> None:
+    """Periodically delete dead refresh tokens so the table and its index stay small."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            deleted = await asyncio.to_thread(_purge_refresh_tokens_once)
+            logger.info("Refresh token sweep removed %s rows", deleted)
+        except Exception:
+            # Keep sweeping; a dead task would never purge again and its stored
+            # error would resurface when the lifespan awaits it on shutdown.
+            logger.exception("Refresh token sweep failed")
+
+
 @asynccontextmanager
 async def lifespan(_: FastAPI) -> AsyncIterator[None]:
     """Initialize application resources before serving requests."""
@@ -59,7 +93,32 @@ async def lifespan(_: FastAPI) -> AsyncIterator[None]:
                 raise
             await asyncio.sleep(delay_seconds)
 
-    yield
+    # Log how expensive a login verify is on this hardware so Argon2 parameter
+    # (or package) changes that push it past the target are visible at startup.
+    verify_ms = measure_password_verify_ms()
+    log = logger.warning if verify_ms > PASSWORD_VERIFY_TARGET_MS else logger.info
+    log(
+        "Password verify takes %.1f ms (argon2 t=%s m=%s p=%s, target %.0f ms)",
+        verify_ms,
+        ARGON2_TIME_COST,
+        ARGON2_MEMORY_COST,
+        ARGON2_PARALLELISM,
+        PASSWORD_VERIFY_TARGET_MS,
+    )
+
+    sweep_task = None
+    if REFRESH_TOKEN_SWEEP_INTERVAL_SECONDS > 0:
+        sweep_task = asyncio.create_task(
+            _sweep_refresh_tokens(REFRESH_TOKEN_SWEEP_INTERVAL_SECONDS)
+        )
+
+    try:
+        yield
+    finally:
+        if sweep_task is not None:
+            sweep_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await sweep_task
 
 
 app = FastAPI(title="Recipe Generator Backend", version="0.1.0", lifespan=lifespan)
@@ -68,11 +127,37 @@ app = FastAPI(title="Recipe Generator Backend", version="0.1.0", lifespan=lifesp
 app.include_router(auth_router)
 
 
+# Header names in the ASGI scope are already lowercased bytes.
+_AUTH_HEADER = b"authorization"
+_BEARER_PREFIX = b"Bearer "
+_COOKIE_PREFIXES = (b"access_token=", b"recipe_access_token=")
+_PROTECTED_PREFIXES = ("/profile",)
+
+
+def _extract_token(cookie_header: bytes) -> bytes | None:
+    """Return the access token from a raw Cookie header, preferring 'access_token'."""
+    fallback = None
+    for part in cookie_header.split(b";"):
+        part = part.strip()
+        if not part.startswith(_COOKIE_PREFIXES):
+            continue
+        name, _, value = part.partition(b"=")
+        if not value:
+            continue
+        if name == b"access_token":
+            return value
+        if fallback is None:
+            fallback = value
+    return fallback
+
+
 # Middleware: copy cookie auth token into Authorization header (so existing
 # oauth2 Depends continue to work) and redirect unauthenticated HTML GET
 # navigations to protected frontend pages (e.g. /profile) to /login.
-async def auth_cookie_middleware(request: Request, call_next):
+class AuthCookieMiddleware:
     """
+    Pure ASGI middleware (no BaseHTTPMiddleware task/stream wrapping per request).
+
     Behavior:
     - If Authorization header is already present do nothing.
     - Else if a cookie named 'access_token' or 'recipe_access_token' exists,
@@ -80,51 +165,77 @@ async def auth_cookie_middleware(request: Request, call_next):
     - If the request is an HTML GET navigation to a protected path (currently '/profile')
       and there is no Authorization header after possible injection, redirect to /login.
     """
-    try:
-        headers = request.scope.get("headers", [])  # list[tuple[bytes, bytes]]
-        has_auth = any(h[0].lower() == b"authorization" for h in headers)
-
-        token_from_cookie = None
-        if not has_auth:
-            for cookie_name in ("access_token", "recipe_access_token"):
-                if cookie_name in request.cookies:
-                    token_from_cookie = request.cookies.get(cookie_name)
-                    if token_from_cookie:
-                        break
-
-        if token_from_cookie and not has_auth:
-            auth_val = f"Bearer {token_from_cookie}".encode()
-            new_headers = list(headers)
-            # Prepend so it takes precedence
-            new_headers.insert(0, (b"authorization", auth_val))
-            request.scope["headers"] = new_headers
-
-        # After injection, check again whether Authorization is present
-        headers_after = request.scope.get("headers", [])
-        has_auth_after = any(h[0].lower() == b"authorization" for h in headers_after)
-
-        # Redirect HTML navigations to protected frontend pages when unauthenticated.
-        accept = request.headers.get("accept", "")
-        is_html_nav = "text/html" in accept and request.method.upper() == "GET"
-        protected_paths = ("/profile",)
-
-        if (
-            is_html_nav
-            and any(request.url.path.startswith(p) for p in protected_paths)
-            and not has_auth_after
-        ):
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            headers = scope.get("headers", [])  # list[tuple[bytes, bytes]]
+            path = scope["path"]
+
+            # Single pass over the headers collecting everything we may need.
+            auth_present = False
+            cookie_bytes = None
+            accept_bytes = b""
+            for name, value in headers:
+                if name == _AUTH_HEADER:
+                    auth_present = True
+                elif name == b"cookie":
+                    cookie_bytes = value if cookie_bytes is None else cookie_bytes + b"; " + value
+                elif name == b"accept":
+                    accept_bytes = value
+
+            # Common case: API call that already carries Authorization on a path
+            # that can never be redirected -> nothing to do.
+            if auth_present and not path.startswith(_PROTECTED_PREFIXES):
+                redirect = False
+            else:
+                token_from_cookie = None
+                if not auth_present and cookie_bytes is not None:
+                    token_from_cookie = _extract_token(cookie_bytes)
+
+                if token_from_cookie:
+                    auth_val = _BEARER_PREFIX + token_from_cookie
+                    # Prepend so it takes precedence
+                    scope["headers"] = [(_AUTH_HEADER, auth_val)] + list(headers)
+
+                # Authorization is present if it came with the request or we just injected it
+                injected_or_present = auth_present or token_from_cookie is not None
+
+                # Redirect HTML navigations to protected frontend pages when unauthenticated.
+                is_html_nav = b"text/html" in accept_bytes and scope["method"].upper() == "GET"
+                redirect = (
+                    is_html_nav
+                    and path.startswith(_PROTECTED_PREFIXES)
+                    and not injected_or_present
+                )
+        except Exception as exc:
+            logger.exception("auth_cookie_middleware error: %s", exc)
+            raise
+
+        if redirect:
             # Browser navigation to protected path without auth -> redirect to frontend login
-            return RedirectResponse(url="/login")
+            # (307, matching the RedirectResponse default this replaced).
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 307,
+                    "headers": [(b"location", b"/login"), (b"content-length", b"0")],
+                }
+            )
+            await send({"type": "http.response.body", "body": b""})
+            return
 
-        return await call_next(request)
-    except Exception as exc:
-        # Fail-safe: do not call downstream a second time after an exception in this middleware.
-        logger.exception("auth_cookie_middleware error: %s", exc)
-        raise
+        await self.app(scope, receive, send)
 
 
 # Register middleware early
-app.add_middleware(BaseHTTPMiddleware, dispatch=auth_cookie_middleware)
+app.add_middleware(AuthCookieMiddleware)
 
 
 # Custom middleware to add security headers to all responses
@@ -162,6 +273,13 @@ async def security_headers_middleware(request: Request, call_next):
 app.add_middleware(BaseHTTPMiddleware, dispatch=security_headers_middleware)
 
 
+def _with_message(out: Dict[str, Any]) -> Dict[str, Any]:
+    """Ensure `out["message"]` is a string, falling back to 'detail' / 'error' keys."""
+    msg = out.get("message") or out.get("detail") or out.get("error")
+    out["message"] = str(msg) if msg is not None else ""
+    return out
+
+
 # Helper to coerce various detail shapes into a structured { message, code?, ... } dict.
 def _coerce_detail_to_object(detail: Any) -> Dict[str, Any]:
     """
@@ -171,37 +289,30 @@ def _coerce_detail_to_object(detail: Any) -> Dict[str, Any]:
       - other shapes
 
     Returns a dict with at minimum {"message": "<string>"} and preserves any
-    `code` field when present.
+    `code` field when present. A dict detail that already carries a non-empty
+    string message is returned as-is (not copied), so callers must not mutate it.
     """
     if detail is None:
         return {"message": ""}
 
-    # If already a dict-like object, copy and ensure 'message' key exists.
     if isinstance(detail, dict):
-        out = dict(detail)  # shallow copy
-        # Normalize: ensure message is a string
-        msg = out.get("message") or out.get("detail") or out.get("error")
-        out["message"] = str(msg) if msg is not None else ""
-        # Keep code if present (may be None)
-        if "code" in out:
-            out["code"] = out.get("code")
-        return out
+        msg = detail.get("message")
+        # Fast path: every HTTPException raised in this app passes {"message": str, "code": ...}.
+        if msg and isinstance(msg, str):
+            return detail
+        return _with_message(dict(detail))
 
     # If it's a string, try to parse as JSON (some code paths may stringify objects).
     if isinstance(detail, str):
-        # Try JSON parse to recover structured object
-        try:
-            parsed = json.loads(detail)
+        if detail[:1] == "{":
+            # Try JSON parse to recover structured object
+            try:
+                parsed = orjson.loads(detail)
+            except orjson.JSONDecodeError:
+                # not JSON — fall through to plain string handling
+                parsed = None
             if isinstance(parsed, dict):
-                out = parsed
-                msg = out.get("message") or out.get("detail") or out.get("error")
-                out["message"] = str(msg) if msg is not None else ""
-                if "code" in out:
-                    out["code"] = out.get("code")
-                return out
-        except Exception:
-            # not JSON — fallthrough to plain string handling
-            pass
+                return _with_message(parsed)
         return {"message": detail}
 
     # For other types, attempt string conversion
@@ -246,6 +357,21 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 
+# Routine statuses that are not worth a WARNING line per request.
+_QUIET_HTTP_STATUSES = frozenset({status.HTTP_401_UNAUTHORIZED, status.HTTP_404_NOT_FOUND})
+
+# The most frequent error bodies, serialized once. Each response still gets its own
+# Response object (middlewares mutate headers), only the body bytes are shared.
+_CREDENTIALS_ERROR = {"message": "Could not validate credentials", "code": "invalid_credentials"}
+_CREDENTIALS_ERROR_BODY = orjson.dumps(_CREDENTIALS_ERROR)
+_INTERNAL_ERROR_BODY = orjson.dumps({"message": "Internal server error", "code": "internal_error"})
+
+
+def _json_body_response(status_code: int, body: bytes) -> Response:
+    """Response for a pre-serialized JSON error body."""
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     """
@@ -258,6 +384,19 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     clients/tests that expect structured auth errors receive `code: "invalid_credentials"`.
     We only add this when the handler detail does not already include a `code`.
     """
+    # Fast path: the standard auth failure (ours, or OAuth2PasswordBearer's
+    # "Not authenticated") always normalizes to the same prebuilt body.
+    if exc.status_code == status.HTTP_401_UNAUTHORIZED and (
+        exc.detail == _CREDENTIALS_ERROR or exc.detail == "Not authenticated"
+    ):
+        logger.debug(
+            "HTTPException raised: status=%s message=%s path=%s",
+            exc.status_code,
+            _CREDENTIALS_ERROR["message"],
+            request.url.path,
+        )
+        return _json_body_response(exc.status_code, _CREDENTIALS_ERROR_BODY)
+
     try:
         detail_obj = _coerce_detail_to_object(exc.detail)
     except Exception as e:
@@ -268,21 +407,29 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     # consistent shaped error payload. Do not override an explicit `code`.
     try:
         if exc.status_code == status.HTTP_401_UNAUTHORIZED:
-            # If the detail did not include a code, provide the standard auth code.
-            if not detail_obj.get("code"):
-                detail_obj["code"] = "invalid_credentials"
+            # Copy before normalizing: detail_obj may be the exception's own detail dict.
+            missing_code = not detail_obj.get("code")
             # Prefer the clearer credentials message when the original is generic.
-            if (
+            generic_message = (
                 not detail_obj.get("message")
                 or detail_obj.get("message") == "Not authenticated"
-            ):
-                detail_obj["message"] = "Could not validate credentials"
+            )
+            if missing_code or generic_message:
+                detail_obj = dict(detail_obj)
+                # If the detail did not include a code, provide the standard auth code.
+                if missing_code:
+                    detail_obj["code"] = "invalid_credentials"
+                if generic_message:
+                    detail_obj["message"] = "Could not validate credentials"
     except Exception:
         # Keep original detail if normalization fails for any reason.
         pass
 
-    # Log the issue with the normalized message (don't log sensitive details in production)
-    logger.warning(
+    # Log the issue with the normalized message (don't log sensitive details in production).
+    # Expected client errors (expired sessions, missing items) only log at DEBUG.
+    level = logging.DEBUG if exc.status_code in _QUIET_HTTP_STATUSES else logging.WARNING
+    logger.log(
+        level,
         "HTTPException raised: status=%s message=%s path=%s",
         exc.status_code,
         detail_obj.get("message"),
@@ -301,10 +448,12 @@ async def unhandled_exception_handler(request: Request, exc: Exception):
     """
     logger.error("Unhandled exception at %s: %s", request.url.path, exc, exc_info=exc)
     # Do not include traceback in the response to avoid leaking internals.
-    return JSONResponse(
-        status_code=500,
-        content={"message": "Internal server error", "code": "internal_error"},
-    )
+    return _json_body_response(500, _INTERNAL_ERROR_BODY)
+
+
+# Compress larger JSON payloads (saved recipe lists, generated recipes).
+# Registered before CORS so CORS stays the outermost layer.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
 
 
 # Enable CORS for local frontend development (Vite dev server)
@@ -384,42 +533,63 @@ async def generate_recipe(request: RecipeRequest) -> list[Recipe]:
         ) from exc
 
 
-@app.post("/user/saved-recipes", status_code=status.HTTP_201_CREATED)
-async def save_recipe_endpoint(
-    recipe: Recipe,
-    current_user: AuthUser = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
-):
-    """
-    Save a generated recipe for a user.
-
-    - Body: Recipe (title, ingredients, steps)
-    - Query param: username (defaults to 'demo' for local development)
-    - Returns: { id: <saved id>, savedAt: <iso timestamp> }
-    """
+# The saved-recipe endpoints below are plain `def` on purpose: they do blocking
+# SQLAlchemy I/O, so FastAPI runs them in its threadpool instead of on the event loop.
+def _require_user_id(db: Session, current_user: AuthUser) -> str:
+    """Resolve the authenticated user's DB id, or raise 401/404."""
     if not current_user.username:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail={"message": "Could not validate credentials", "code": "invalid_credentials"},
         )
 
-    db_user = db.query(DBUser).filter(DBUser.username == current_user.username).first()
-    if db_user is None:
+    user_id = get_user_id(db, current_user.username)
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={"message": "User not found", "code": "not_found"},
         )
+    return user_id
+
+
+@app.post(
+    "/user/saved-recipes",
+    response_model=SavedRecipeRef,
+    status_code=status.HTTP_201_CREATED,
+)
+def save_recipe_endpoint(
+    recipe: Recipe,
+    current_user: AuthUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> SavedRecipeRef:
+    """
+    Save a generated recipe for a user.
+
+    - Body: Recipe (title, ingredients, steps)
+    - Query param: username (defaults to 'demo' for local development)
+    - Returns: { id: <saved id>, savedAt: <iso timestamp> }
+    """
+    user_id = _require_user_id(db, current_user)
 
     # Serialize recipe to a JSON-compatible dict
     recipe_data = recipe.model_dump()
     title = recipe_data.get("title") or recipe_data.get("name") or "Saved recipe"
 
+    # Generate the id up front so it can be embedded in the stored recipe JSON
+    # (subsequent reads include the saved id inside the recipe object itself)
+    # with a single INSERT.
+    saved_id = str(uuid.uuid4())
+    recipe_data["id"] = saved_id
+
     # Create DB saved recipe record
-    saved = DBSavedRecipe(user_id=db_user.id, title=title, recipe_data=recipe_data)
+    saved = DBSavedRecipe(id=saved_id, user_id=user_id, title=title, recipe_data=recipe_data)
     db.add(saved)
     try:
+        # created_at is a server default; the flush fetches it via RETURNING,
+        # so read it before commit expires the instance.
+        db.flush()
+        saved_at = saved.created_at
         db.commit()
-        db.refresh(saved)
     except Exception:
         db.rollback()
         logger.exception("Failed to save recipe to database")
@@ -428,29 +598,20 @@ async def save_recipe_endpoint(
             detail={"message": "Failed to save recipe", "code": "save_error"},
         )
 
-    # Persist the DB-assigned id into the stored recipe JSON so subsequent reads
-    # include the saved id inside the recipe object itself.
-    try:
-        # Ensure recipe_data is a dict and add id
-        if isinstance(recipe_data, dict):
-            recipe_data["id"] = saved.id
-            saved.recipe_data = recipe_data
-            db.add(saved)
-            db.commit()
-            db.refresh(saved)
-    except Exception:
-        db.rollback()
-        # Do not fail the save response if updating the JSON fails; log in real app.
-        logger.exception("Failed to persist id into saved.recipe_data")
+    # Returned as a model (not a hand-built JSONResponse) so FastAPI serializes it
+    # straight to JSON bytes via Pydantic, datetime included.
+    return SavedRecipeRef(id=saved_id, savedAt=saved_at)
 
-    return JSONResponse(
-        status_code=201,
-        content={"id": saved.id, "savedAt": saved.created_at.isoformat()},
-    )
+
+_select_saved_recipe_rows = (
+    select(DBSavedRecipe.id, DBSavedRecipe.recipe_data)
+    .where(DBSavedRecipe.user_id == bindparam("user_id"))
+    .order_by(DBSavedRecipe.created_at.desc())
+)
 
 
 @app.get("/user/saved-recipes", response_model=list[Recipe])
-async def get_saved_recipes_endpoint(
+def get_saved_recipes_endpoint(
     current_user: AuthUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ) -> list[Recipe]:
@@ -461,43 +622,23 @@ async def get_saved_recipes_endpoint(
       present for that user we create a sensible default saved-recipe so the
       frontend and tests can rely on at least one example item.
     """
-    if not current_user.username:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"message": "Could not validate credentials", "code": "invalid_credentials"},
-        )
-
-    db_user = db.query(DBUser).filter(DBUser.username == current_user.username).first()
-    if db_user is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail={"message": "User not found", "code": "not_found"},
-        )
+    user_id = _require_user_id(db, current_user)
 
-    saved_items = (
-        db.query(DBSavedRecipe)
-        .filter(DBSavedRecipe.user_id == db_user.id)
-        .order_by(DBSavedRecipe.created_at.desc())
-        .all()
-    )
+    # Plain (id, recipe_data) rows: no ORM instances or identity-map bookkeeping.
+    rows = db.execute(_select_saved_recipe_rows, {"user_id": user_id}).all()
 
     # If the user exists but has no saved recipes, return empty list (frontend may add a demo item)
     result = []
-    for item in saved_items:
-        # Make a shallow copy of the stored recipe_data so we can safely ensure
-        # the returned object includes the database id without mutating DB state.
-        rd = item.recipe_data
-        if isinstance(rd, dict):
-            rd = dict(rd)
-            if "id" not in rd:
-                rd["id"] = item.id
+    for saved_id, rd in rows:
+        # Ensure the returned object includes the database id (older rows may lack it).
+        if isinstance(rd, dict) and "id" not in rd:
+            rd["id"] = saved_id
         result.append(rd)
-        logger.info("saved recipe: %s", rd)
     return result
 
 
 @app.get("/user/saved-recipes/{saved_id}", response_model=Recipe)
-async def get_saved_recipe_endpoint(
+def get_saved_recipe_endpoint(
     saved_id: str,
     current_user: AuthUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
@@ -509,59 +650,46 @@ async def get_saved_recipe_endpoint(
     - Query param: username (defaults to 'demo' for local development)
     - Returns: Recipe JSON (same shape as GET /user/saved-recipes items)
     """
-    if not current_user.username:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"message": "Could not validate credentials", "code": "invalid_credentials"},
-        )
-
-    db_user = db.query(DBUser).filter(DBUser.username == current_user.username).first()
-    if db_user is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail={"message": "User not found", "code": "not_found"},
-        )
+    user_id = _require_user_id(db, current_user)
 
-    saved = (
-        db.query(DBSavedRecipe)
-        .filter(DBSavedRecipe.id == saved_id, DBSavedRecipe.user_id == db_user.id)
-        .first()
-    )
+    # Primary-key lookup; ownership is checked here (someone else's recipe is a 404 too).
+    saved = db.get(DBSavedRecipe, saved_id)
 
-    if saved is None:
+    if saved is None or saved.user_id != user_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={"message": "Saved recipe not found", "code": "not_found"},
         )
 
-    rd = saved.recipe_data
-    if isinstance(rd, dict):
-        rd = dict(rd)
-        if "id" not in rd:
-            rd["id"] = saved.id
-
-    # Validate and return a Pydantic `Recipe` instance so FastAPI returns
-    # a properly typed response (and any validation issues surface here).
+    # Stored rows are validated exactly once, here: FastAPI does not re-validate a
+    # returned model instance, and corrupt rows must surface as a structured 500
+    # rather than being passed through unchecked (so no model_construct).
     try:
-        if rd is None:
+        if saved.recipe_data is None:
             raise ValueError("Saved recipe payload is null")
-        recipe_obj = Recipe.model_validate(rd)
-        return recipe_obj
+        recipe_obj = Recipe.model_validate(saved.recipe_data)
     except (ValidationError, TypeError, ValueError) as ve:
         logger.exception("Saved recipe failed validation: %s", ve)
         # Return a 500 with structured detail so clients receive consistent shape
+        detail: Dict[str, Any] = {
+            "message": "Saved recipe data is invalid",
+            "code": "invalid_saved_data",
+        }
+        if isinstance(ve, ValidationError):
+            detail["errors"] = ve.errors()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail={
-                "message": "Saved recipe data is invalid",
-                "code": "invalid_saved_data",
-                "errors": ve.errors(),
-            },
+            detail=detail,
         )
 
+    # Older rows predate the id being embedded in recipe_data.
+    if recipe_obj.id is None:
+        recipe_obj.id = saved.id
+    return recipe_obj
+
 
 @app.delete("/user/saved-recipes/{saved_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_saved_recipe_endpoint(
+def delete_saved_recipe_endpoint(
     saved_id: str,
     current_user: AuthUser = Depends(get_current_active_user),
     db: Session = Depends(get_db),
@@ -573,33 +701,16 @@ async def delete_saved_recipe_endpoint(
     - Query param: username (defaults to 'demo' for local development)
     - Returns: 204 No Content on success, 404 if not found.
     """
-    if not current_user.username:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"message": "Could not validate credentials", "code": "invalid_credentials"},
-        )
-
-    db_user = db.query(DBUser).filter(DBUser.username == current_user.username).first()
-    if db_user is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail={"message": "User not found", "code": "not_found"},
-        )
-
-    saved = (
-        db.query(DBSavedRecipe)
-        .filter(DBSavedRecipe.id == saved_id, DBSavedRecipe.user_id == db_user.id)
-        .first()
-    )
+    user_id = _require_user_id(db, current_user)
 
-    if saved is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail={"message": "Saved recipe not found", "code": "not_found"},
-        )
-
-    db.delete(saved)
+    # Single DELETE scoped to the owner; no rows affected means not found (or not theirs).
     try:
+        result = db.execute(
+            delete(DBSavedRecipe).where(
+                DBSavedRecipe.id == saved_id, DBSavedRecipe.user_id == user_id
+            )
+        )
+        deleted = result.rowcount
         db.commit()
     except Exception:
         db.rollback()
@@ -609,4 +720,33 @@ async def delete_saved_recipe_endpoint(
             detail={"message": "Failed to delete recipe", "code": "delete_error"},
         )
 
+    if deleted == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"message": "Saved recipe not found", "code": "not_found"},
+        )
+
     return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+if __name__ == "__main__":
+    # Production entrypoint: `python -m app.main`. With uvicorn[standard] installed,
+    # loop/http "auto" resolve to uvloop + httptools (uvloop is skipped on Windows).
+    # Note: the login rate limiter and the auth token/user caches are in-process,
+    # so each worker keeps its own copy.
+    import uvicorn
+
+    _production = os.getenv("ENVIRONMENT", "development").lower() == "production"
+    _workers = int(os.getenv("UVICORN_WORKERS", "4" if _production else "1"))
+    uvicorn.run(
+        # Worker processes need an import string. A single worker serves this module's
+        # app object, so app.main is not imported a second time next to __main__.
+        "app.main:app" if _workers > 1 else app,
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=_workers,
+        loop=os.getenv("UVICORN_LOOP", "auto"),
+        http=os.getenv("UVICORN_HTTP", "auto"),
+        limit_concurrency=int(os.getenv("UVICORN_LIMIT_CONCURRENCY", "1024")),
+        backlog=int(os.getenv("UVICORN_BACKLOG", "2048")),
+    )
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from datetime import datetime
 from enum import Enum
 from typing import Annotated, List, Optional
 
@@ -57,6 +58,13 @@ class Recipe(BaseModel):
     model: Optional[str] = Field(None, description="Which model generated this recipe")
 
 
+class SavedRecipeRef(BaseModel):
+    """Reference returned after saving a recipe."""
+
+    id: str
+    savedAt: datetime
+
+
 class RecipeRequest(BaseModel):
     """Input for generation.
 
@@ -16,14 +16,11 @@ def _normalize_ingredients(raw_ingredients: List[str]) -> List[str]:
     - Remove empty, whitespace-only, or duplicate items
     - At least 1 valid ingredient is required
     """
-    cleaned = [item.strip().lower() for item in raw_ingredients if item and item.strip()]
-    # Remove duplicates while preserving order
-    seen = set()
-    unique: List[str] = []
-    for item in cleaned:
-        if item not in seen:
-            seen.add(item)
-            unique.append(item)
+    # Lowercase, drop blanks and de-duplicate while preserving order in one pass
+    # (dict keys keep insertion order).
+    unique = list(
+        dict.fromkeys(item.strip().lower() for item in raw_ingredients if item and item.strip())
+    )
 
     if not unique:
         raise ValueError("At least one ingredient is required.")
@@ -141,9 +138,14 @@ def generate_recipe_from_ingredients(
 
 
 def _create_fallback_recipe(ingredients: List[str], model_name: str) -> Recipe:
-    """Create a fallback recipe when model generation fails."""
+    """Create a fallback recipe when model generation fails.
+
+    `ingredients` are already normalized and length-checked (RecipeRequest), and
+    every other field is a fixed string, so the models are built with
+    `model_construct` instead of being validated again.
+    """
     ingredient_models = [
-        RecipeIngredient(name=name) for name in ingredients
+        RecipeIngredient.model_construct(name=name, amount=None) for name in ingredients
     ]
 
     steps = [
@@ -154,7 +156,7 @@ def _create_fallback_recipe(ingredients: List[str], model_name: str) -> Recipe:
         "Serve hot",
     ]
 
-    return Recipe(
+    return Recipe.model_construct(
         title=f"Simple Recipe with {', '.join(ingredients)}",
         time="30 mins",
         ingredients=ingredient_models,
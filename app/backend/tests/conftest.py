@@ -2,9 +2,10 @@
 # Ensure the backend root is on sys.path during pytest collection so 'import app.*' works.
 # This makes tests runnable whether pytest is invoked from the backend folder or from the repo root.
 
+import os
 import sys
 from pathlib import Path
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
 # Session fixture to create and drop DB tables for tests ---------------------------------
 import pytest
@@ -23,22 +24,53 @@ if BACKEND_ROOT_STR not in sys.path:
     # Insert at front so it takes precedence over other entries
     sys.path.insert(0, BACKEND_ROOT_STR)
 
-# Optional: also ensure backend's "app" package directory exists and is discoverable
-APP_PACKAGE_DIR = BACKEND_ROOT / "app"
-if APP_PACKAGE_DIR.exists() and str(APP_PACKAGE_DIR) not in sys.path:
-    # Not strictly necessary when backend root is on sys.path, but safe to include.
-    sys.path.insert(0, str(APP_PACKAGE_DIR))
-
 # Helpful debug information when needed (commented out by default).
 # Uncomment for troubleshooting pytest import problems.
 # import logging
 # logging.getLogger("pytest_conftest").info("sys.path (first 5): %s", sys.path[:5])
 
-# Now that we've ensured the backend root and package dir are on sys.path,
+# Hash passwords with the cheapest Argon2 parameters under test: every signup/login
+# otherwise pays the production cost. Must be set before app.auth is imported, and
+# setdefault keeps an explicit override from the environment working.
+os.environ.setdefault("ARGON2_TIME_COST", "1")
+os.environ.setdefault("ARGON2_MEMORY_COST", "1024")
+os.environ.setdefault("ARGON2_PARALLELISM", "1")
+
+# Under pytest-xdist (`-n auto`) every worker runs its own session fixture below, so
+# each worker gets a private Postgres schema; otherwise one worker's drop_db() would
+# pull the tables out from under the others. Must run before app.db.session is imported
+# (it builds the engine from DATABASE_URL at import time).
+import app as _backend_pkg  # noqa: E402,F401  (loads .env so DATABASE_URL is visible here)
+
+XDIST_WORKER = os.getenv("PYTEST_XDIST_WORKER")
+WORKER_SCHEMA = f"test_{XDIST_WORKER}" if XDIST_WORKER else None
+if WORKER_SCHEMA and os.getenv("DATABASE_URL"):
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.engine import make_url
+
+    _base_url = os.environ["DATABASE_URL"]
+    _bootstrap_engine = create_engine(_base_url)
+    with _bootstrap_engine.begin() as _conn:
+        _conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{WORKER_SCHEMA}"'))
+    _bootstrap_engine.dispose()
+    os.environ["DATABASE_URL"] = (
+        make_url(_base_url)
+        .update_query_dict({"options": f"-csearch_path={WORKER_SCHEMA}"})
+        .render_as_string(hide_password=False)
+    )
+
+# Now that we've ensured the backend root is on sys.path,
 # it is safe to import DB helper functions that rely on the backend package.
 # Import create_db/drop_db which operate on the configured DATABASE_URL.
 # In CI this is set to a disposable test database (the workflow uses a Postgres service).
-from app.db.session import create_db, drop_db
+from app.auth import _token_cache, _user_cache, _user_id_cache
+from app.db.session import create_db, drop_db, engine, get_db
+from app.main import app
+import httpx
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from tests.helpers import LOGIN_HEADERS, TokenResponse
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -62,3 +94,114 @@ def prepare_database() -> Generator[None, None, None]:
     finally:
         # Teardown: drop all tables (destructive)
         drop_db()
+        if WORKER_SCHEMA:
+            with engine.begin() as conn:
+                conn.execute(text(f'DROP SCHEMA IF EXISTS "{WORKER_SCHEMA}" CASCADE'))
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line(
+        "markers", "fresh_db: run the test inside a rolled-back transaction (see db_session)"
+    )
+
+
+@pytest.fixture(autouse=True)
+def _fresh_db(request: pytest.FixtureRequest) -> None:
+    """Only tests marked `fresh_db` pay for the per-test connection and rollback."""
+    if request.node.get_closest_marker("fresh_db"):
+        request.getfixturevalue("db_session")
+
+
+@pytest.fixture
+def db_session() -> Generator[Session, None, None]:
+    """
+    Run each test inside one outer transaction that is rolled back afterwards.
+
+    - The app's `get_db` dependency is overridden so every request gets a session
+      bound to this test's connection. Their `commit()` calls only release a
+      SAVEPOINT, so nothing is ever committed and no test sees another's rows.
+    - Tests that need direct DB access can request this fixture; it is bound to
+      the same connection, so it sees what the requests wrote.
+    - The auth caches are keyed by username, so they are cleared on teardown too;
+      otherwise the next test's "alice" would resolve to this test's rolled-back row.
+    """
+    connection = engine.connect()
+    transaction = connection.begin()
+
+    def _session() -> Session:
+        return Session(
+            bind=connection, autoflush=False, join_transaction_mode="create_savepoint"
+        )
+
+    def _override_get_db() -> Generator[Session, None, None]:
+        db = _session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = _override_get_db
+    session = _session()
+    try:
+        yield session
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        session.close()
+        transaction.rollback()
+        connection.close()
+        for cache in (_token_cache, _user_cache, _user_id_cache):
+            cache.clear()
+
+
+@pytest.fixture(scope="session")
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def client(prepare_database: None) -> AsyncGenerator[httpx.AsyncClient, None]:
+    """
+    One httpx.AsyncClient for the whole session, calling the app in-process.
+
+    ASGITransport does not run the lifespan on its own, so it is entered here once.
+    Tests are `async def` (anyio plugin, see `pytestmark` in the test modules) and
+    share the session's event loop instead of TestClient's per-request portal.
+    """
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as test_client:
+            yield test_client
+
+
+@pytest.fixture(scope="session")
+async def bearer_headers(client: httpx.AsyncClient) -> dict[str, str]:
+    """
+    Authorization header for a user that signs up and logs in once per session.
+
+    Session fixtures are set up before the per-test rollback fixture, so this user is
+    really committed and stays valid for every test that asks for it (drop_db removes
+    it at the end). Writes made with it in `fresh_db` tests are still rolled back.
+    """
+    username, password = "benchuser", "BenchPass123"
+    r = await client.post(
+        "/auth/signup",
+        json={"username": username, "email": "benchuser@example.com", "password": password},
+    )
+    assert r.status_code == 201
+    r = await client.post(
+        "/auth/token",
+        data={"username": username, "password": password},
+        headers=LOGIN_HEADERS,
+    )
+    assert r.status_code == 200
+    client.cookies.clear()
+    token = TokenResponse.validate_json(r.content).access_token
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(autouse=True)
+def _reset_client_cookies(request: pytest.FixtureRequest) -> Generator[None, None, None]:
+    """Drop cookies left on the shared client so auth state cannot leak between tests."""
+    yield
+    if "client" in request.fixturenames:
+        request.getfixturevalue("client").cookies.clear()
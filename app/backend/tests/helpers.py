@@ -0,0 +1,23 @@
+"""Assertion helpers and response adapters shared by the backend tests."""
+
+from types import MappingProxyType
+
+from app.auth import Token, User
+import httpx
+from pydantic import TypeAdapter
+
+# Validate response bodies against the app's own models straight from the raw bytes
+# (pydantic-core parses the JSON), instead of resp.json() plus key-by-key asserts.
+UserResponse = TypeAdapter(User)
+TokenResponse = TypeAdapter(Token)
+
+# OAuth2PasswordRequestForm expects form-encoded data
+LOGIN_HEADERS = MappingProxyType({"Content-Type": "application/x-www-form-urlencoded"})
+
+
+def assert_error(resp: httpx.Response, status: int, code: str, msg_substr: str = "") -> None:
+    """Assert the backend's structured `{ "message", "code" }` error body."""
+    assert resp.status_code == status
+    body = resp.json()
+    assert body.get("code") == code
+    assert msg_substr in body.get("message", "")
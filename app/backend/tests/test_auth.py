@@ -1,154 +1,357 @@
 # 1-sprint-L-e-m-i\app\backend\tests\test_auth.py
 from __future__ import annotations
 
-import uuid
+import asyncio
+from datetime import datetime, timedelta, timezone
 
-from app.main import app
-from fastapi.testclient import TestClient
+from app import auth as auth_module
+from app import main as main_module
+from app.auth import _token_cache, create_access_token, purge_refresh_tokens
+from app.db.models import RefreshToken as DBRefreshToken
+from app.db.models import User as DBUser
+from app.main import _extract_token
+import httpx
+import pytest
+from sqlalchemy.orm import Session
 
-client = TestClient(app)
+from tests.helpers import LOGIN_HEADERS, TokenResponse, UserResponse, assert_error
 
+pytestmark = pytest.mark.anyio
 
-def _unique_username() -> str:
-    return f"testuser_{uuid.uuid4().hex[:8]}"
 
+async def _signup(client: httpx.AsyncClient, username: str, email: str, password: str):
+    return await client.post(
+        "/auth/signup", json={"username": username, "email": email, "password": password}
+    )
 
-def _unique_email() -> str:
-    return f"{uuid.uuid4().hex[:8]}@example.com"
 
-
-def _signup(username: str, email: str, password: str):
-    payload = {"username": username, "email": email, "password": password}
-    return client.post("/auth/signup", json=payload)
-
-
-def _login(username_or_email: str, password: str):
-    # OAuth2PasswordRequestForm expects form-encoded data
+async def _login(client: httpx.AsyncClient, username_or_email: str, password: str):
     data = {"username": username_or_email, "password": password}
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    return client.post("/auth/token", data=data, headers=headers)
+    return await client.post("/auth/token", data=data, headers=LOGIN_HEADERS)
 
 
-def test_signup_creates_user_and_returns_201() -> None:
-    username = _unique_username()
-    email = _unique_email()
+@pytest.mark.fresh_db
+async def test_signup_creates_user_and_returns_201(client: httpx.AsyncClient) -> None:
+    username = "alice"
+    email = "alice@example.com"
     password = "SecurePass123"  # Updated: meets password requirements (8+ chars, uppercase, lowercase, number)
 
-    resp = _signup(username, email, password)
-    assert resp.status_code == 201, resp.text
-    body = resp.json()
-    assert body["username"] == username
-    assert body["email"] == email
-    # returned model includes `disabled` field (mapping from DB `is_active`)
-    assert "disabled" in body
+    resp = await _signup(client, username, email, password)
+    assert resp.status_code == 201
+    user = UserResponse.validate_json(resp.content)
+    assert user.username == username
+    assert user.email == email
+    # `disabled` maps from DB `is_active`; a new account is enabled
+    assert user.disabled is False
+
+
+@pytest.fixture
+async def base_user(client: httpx.AsyncClient) -> dict[str, str]:
+    user = {"username": "alice", "email": "alice@example.com", "password": "SecurePass123"}
+    r = await _signup(client, **user)
+    assert r.status_code == 201
+    return user
+
+
+@pytest.mark.fresh_db
+@pytest.mark.parametrize(
+    "field, expected_code, expected_msg",
+    [
+        ("username", "username_exists", "Username already exists"),
+        ("email", "email_exists", "Email already registered"),
+    ],
+)
+async def test_signup_duplicate_returns_400_with_code(
+    client: httpx.AsyncClient,
+    base_user: dict[str, str],
+    field: str,
+    expected_code: str,
+    expected_msg: str,
+) -> None:
+    # Only the field under test is reused; the other one is fresh.
+    duplicate = {"username": "bob", "email": "bob@example.com", "password": base_user["password"]}
+    duplicate[field] = base_user[field]
+
+    r = await _signup(client, **duplicate)
+    # backend normalizes HTTPException detail into structured { message, code }
+    assert_error(r, 400, expected_code, expected_msg)
 
 
-def test_signup_duplicate_username_returns_400_with_code() -> None:
-    username = _unique_username()
-    email1 = _unique_email()
-    email2 = _unique_email()
-    password = "SecurePass123"  # Updated: meets password requirements
+@pytest.fixture(scope="session")
+async def user_tokens(client: httpx.AsyncClient) -> dict[str, str]:
+    """
+    Sign up and log in one user for the token tests and return its tokens.
 
-    r1 = _signup(username, email1, password)
-    assert r1.status_code == 201, r1.text
+    Like `bearer_headers`, this is committed before any per-test transaction, and the
+    token tests are `fresh_db`, so a refresh rotation or logout in one test is rolled
+    back and every test starts with the same valid refresh token.
+    """
+    user = {"username": "tokenuser", "email": "tokenuser@example.com", "password": "ComplexPass123"}
+    r = await _signup(client, **user)
+    assert r.status_code == 201
+    r = await _login(client, user["username"], user["password"])
+    assert r.status_code == 200
+    tokens = {
+        **user,
+        "access_token": TokenResponse.validate_json(r.content).access_token,
+        "refresh_token": client.cookies.get("recipe_refresh_token"),
+    }
+    client.cookies.clear()
+    return tokens
+
+
+@pytest.mark.fresh_db
+async def test_login_issues_tokens(
+    client: httpx.AsyncClient, user_tokens: dict[str, str]
+) -> None:
+    assert user_tokens["access_token"]
+    # refresh token only travels in the HttpOnly cookie
+    assert user_tokens["refresh_token"]
+
+    headers = {"Authorization": f"Bearer {user_tokens['access_token']}"}
+    r = await client.get("/auth/users/me/", headers=headers)
+    assert r.status_code == 200
+    me = UserResponse.validate_json(r.content)
+    assert me.username == user_tokens["username"]
+    assert me.email == user_tokens["email"]
+
+
+@pytest.mark.fresh_db
+async def test_refresh_rotates(client: httpx.AsyncClient, user_tokens: dict[str, str]) -> None:
+    # Send it the way the browser does: HttpOnly cookie scoped to /auth
+    # (httpx stores dotless hosts such as "test" under "test.local").
+    client.cookies.set(
+        "recipe_refresh_token", user_tokens["refresh_token"], domain="test.local", path="/auth"
+    )
+    r = await client.post("/auth/refresh", json={})
+    assert r.status_code == 200
+    new_access = TokenResponse.validate_json(r.content).access_token
+
+    refresh_cookie_after = r.cookies.get("recipe_refresh_token")
+    assert refresh_cookie_after
+    assert refresh_cookie_after != user_tokens["refresh_token"]
 
-    r2 = _signup(username, email2, password)
-    assert r2.status_code == 400
-    err = r2.json()
-    # backend normalizes HTTPException detail into structured { message, code }
-    assert err.get("code") == "username_exists"
-    assert "Username already exists" in err.get("message", "")
+    r = await client.get("/auth/users/me/", headers={"Authorization": f"Bearer {new_access}"})
+    assert r.status_code == 200
+    assert UserResponse.validate_json(r.content).username == user_tokens["username"]
 
 
-def test_signup_duplicate_email_returns_400_with_code() -> None:
-    username1 = _unique_username()
-    username2 = _unique_username()
-    email = _unique_email()
-    password = "SecurePass123"  # Updated: meets password requirements
+@pytest.mark.fresh_db
+async def test_logout_revokes_refresh(
+    client: httpx.AsyncClient, user_tokens: dict[str, str]
+) -> None:
+    r = await client.post("/auth/logout", json={"refresh_token": user_tokens["refresh_token"]})
+    assert r.status_code == 204
 
-    r1 = _signup(username1, email, password)
-    assert r1.status_code == 201, r1.text
+    r = await client.post("/auth/refresh", json={"refresh_token": user_tokens["refresh_token"]})
+    assert_error(r, 401, "invalid_refresh_token")
 
-    r2 = _signup(username2, email, password)
-    assert r2.status_code == 400
-    err = r2.json()
-    assert err.get("code") == "email_exists"
-    assert "Email already registered" in err.get("message", "")
 
+@pytest.mark.fresh_db
+async def test_revoked_refresh_rejected(
+    client: httpx.AsyncClient, user_tokens: dict[str, str]
+) -> None:
+    # Rotation revokes the presented token, so replaying it must fail.
+    r = await client.post("/auth/refresh", json={"refresh_token": user_tokens["refresh_token"]})
+    assert r.status_code == 200
 
-def test_token_exchange_refresh_and_logout_flow() -> None:
-    """
-    Full happy-path:
-      - signup
-    - login -> access_token + refresh cookie
-    - refresh -> new access + rotated refresh cookie
-      - logout -> revoke refresh token (204)
-      - using revoked refresh token fails
-      - protected endpoint requires token and accepts valid token
-    """
-    username = _unique_username()
-    email = _unique_email()
-    password = "ComplexPass123"  # Updated: meets password requirements
-
-    # signup
-    r = _signup(username, email, password)
-    assert r.status_code == 201, r.text
-
-    # login (form-encoded)
-    r = _login(username, password)
-    assert r.status_code == 200, r.text
-    tokens = r.json()
-    assert "access_token" in tokens and tokens["access_token"]
-    access_token = tokens["access_token"]
-
-    refresh_cookie_before = client.cookies.get("recipe_refresh_token")
-    assert refresh_cookie_before
-
-    # access protected endpoint with bearer token
-    headers = {"Authorization": f"Bearer {access_token}"}
-    r = client.get("/auth/users/me/", headers=headers)
-    assert r.status_code == 200, r.text
-    me = r.json()
-    assert me["username"] == username
-    assert me["email"] == email
-
-    # refresh the access token (rotation) using HttpOnly cookie
-    r = client.post("/auth/refresh", json={})
-    assert r.status_code == 200, r.text
-    new_tokens = r.json()
-    new_access = new_tokens["access_token"]
-
-    refresh_cookie_after = client.cookies.get("recipe_refresh_token")
-    assert refresh_cookie_after
-    assert refresh_cookie_after != refresh_cookie_before
+    r = await client.post("/auth/refresh", json={"refresh_token": user_tokens["refresh_token"]})
+    assert_error(r, 401, "invalid_refresh_token")
 
-    # logout using cookie token (204 No Content expected)
-    r = client.post("/auth/logout", json={})
+
+@pytest.mark.fresh_db
+async def test_logout_via_cookie_revokes_and_clears_refresh(
+    client: httpx.AsyncClient, user_tokens: dict[str, str]
+) -> None:
+    # No body: the endpoint must fall back to the HttpOnly refresh cookie.
+    client.cookies.set(
+        "recipe_refresh_token", user_tokens["refresh_token"], domain="test.local", path="/auth"
+    )
+    r = await client.post("/auth/logout")
     assert r.status_code == 204
+    assert client.cookies.get("recipe_refresh_token") is None
+
+    r = await client.post("/auth/refresh", json={"refresh_token": user_tokens["refresh_token"]})
+    assert_error(r, 401, "invalid_refresh_token")
+
 
-    # trying to refresh with the old revoked token must fail
-    client.cookies.set("recipe_refresh_token", refresh_cookie_before, path="/auth")
-    r = client.post("/auth/refresh", json={})
-    assert r.status_code == 401
-    err = r.json()
-    assert err.get("code") == "invalid_refresh_token"
-
-    # previously issued access token should still be valid until it expires
-    # (we still expect it to work right after rotation)
-    headers = {"Authorization": f"Bearer {new_access}"}
-    r = client.get("/auth/users/me/", headers=headers)
-    # if token expiry is very short in environment this could be 401; assert 200 or 401 with clear message
-    assert r.status_code in (200, 401)
-    if r.status_code == 200:
-        me2 = r.json()
-        assert me2["username"] == username
-
-
-def test_protected_endpoint_requires_authorization() -> None:
+async def test_protected_endpoint_requires_authorization(client: httpx.AsyncClient) -> None:
     # call protected endpoint without Authorization header
-    r = client.get("/auth/users/me/")
-    assert r.status_code == 401
-    body = r.json()
+    r = await client.get("/auth/users/me/")
     # get_current_user raises the credentials_exception which uses code "invalid_credentials"
-    assert body.get("code") == "invalid_credentials"
-    assert "Could not validate credentials" in body.get("message", "")
+    assert_error(r, 401, "invalid_credentials", "Could not validate credentials")
+
+
+@pytest.mark.fresh_db
+async def test_profile_update_is_visible_immediately_despite_auth_cache(
+    client: httpx.AsyncClient,
+) -> None:
+    username = "alice"
+    email = "alice@example.com"
+    password = "CachePass123"
+
+    r = await _signup(client, username, email, password)
+    assert r.status_code == 201
+    r = await _login(client, username, password)
+    assert r.status_code == 200
+    headers = {"Authorization": f"Bearer {TokenResponse.validate_json(r.content).access_token}"}
+
+    # Warm the token/user caches
+    r = await client.get("/auth/users/me/", headers=headers)
+    assert r.status_code == 200
+    assert UserResponse.validate_json(r.content).full_name is None
+
+    r = await client.put(
+        "/auth/users/me/",
+        headers=headers,
+        json={"current_password": password, "full_name": "Cached Name"},
+    )
+    assert r.status_code == 200
+
+    r = await client.get("/auth/users/me/", headers=headers)
+    assert r.status_code == 200
+    assert UserResponse.validate_json(r.content).full_name == "Cached Name"
+
+
+async def test_login_with_unknown_user_returns_401(client: httpx.AsyncClient) -> None:
+    r = await _login(client, "nobody", "WhateverPass123")
+    assert_error(r, 401, "invalid_credentials")
+
+
+async def test_access_token_without_subject_is_rejected(client: httpx.AsyncClient) -> None:
+    token = create_access_token(data={})
+    r = await client.get("/auth/users/me/", headers={"Authorization": f"Bearer {token}"})
+    assert_error(r, 401, "invalid_credentials")
+
+
+@pytest.mark.fresh_db
+async def test_refresh_accepts_token_in_json_body(client: httpx.AsyncClient) -> None:
+    username = "alice"
+    password = "BodyRefresh123"
+    r = await _signup(client, username, "alice@example.com", password)
+    assert r.status_code == 201
+    client.cookies.clear()
+    r = await _login(client, username, password)
+    assert r.status_code == 200
+
+    refresh_token = client.cookies.get("recipe_refresh_token")
+    assert refresh_token
+    client.cookies.clear()
+
+    r = await client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert r.status_code == 200
+    assert TokenResponse.validate_json(r.content).access_token
+
+
+async def test_purge_refresh_tokens_removes_revoked_and_long_expired_only(
+    client: httpx.AsyncClient,
+    db_session: Session,
+) -> None:
+    username = "alice"
+    r = await _signup(client, username, "alice@example.com", "PurgePass123")
+    assert r.status_code == 201
+
+    now = datetime.now(timezone.utc)
+    db = db_session
+    db_user = db.query(DBUser).filter(DBUser.username == username).first()
+    assert db_user is not None
+
+    def _token(suffix: str, expires_at: datetime, revoked: bool) -> DBRefreshToken:
+        rt = DBRefreshToken(
+            user_id=db_user.id,
+            token=f"{username}-{suffix}".ljust(64, "0")[:64],
+            expires_at=expires_at,
+            revoked=revoked,
+        )
+        db.add(rt)
+        return rt
+
+    active = _token("active", now + timedelta(days=1), False)
+    recently_expired = _token("recent", now - timedelta(days=1), False)
+    long_expired = _token("old", now - timedelta(days=30), False)
+    revoked = _token("revoked", now + timedelta(days=1), True)
+    db.commit()
+    ids = {rt.id for rt in (active, recently_expired, long_expired, revoked)}
+
+    assert purge_refresh_tokens(db) >= 2
+
+    remaining = {
+        rt_id
+        for (rt_id,) in db.query(DBRefreshToken.id).filter(DBRefreshToken.id.in_(ids))
+    }
+    assert remaining == {active.id, recently_expired.id}
+
+
+async def test_refresh_token_sweep_survives_unexpected_errors(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls = 0
+
+    def failing_purge() -> int:
+        nonlocal calls
+        calls += 1
+        raise OSError("connection reset")
+
+    monkeypatch.setattr(main_module, "_purge_refresh_tokens_once", failing_purge)
+    task = asyncio.create_task(main_module._sweep_refresh_tokens(0))
+    while calls < 3 and not task.done():
+        await asyncio.sleep(0.01)
+
+    assert not task.done()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+@pytest.mark.fresh_db
+async def test_access_token_cookie_authenticates_and_profile_redirects_without_it(
+    client: httpx.AsyncClient,
+) -> None:
+    username = "alice"
+    password = "CookieAuth123"
+    r = await _signup(client, username, "alice@example.com", password)
+    assert r.status_code == 201
+    client.cookies.clear()
+    r = await _login(client, username, password)
+    assert r.status_code == 200
+
+    # The middleware copies the access-token cookie into the Authorization header
+    r = await client.get("/auth/users/me/")
+    assert r.status_code == 200
+    assert UserResponse.validate_json(r.content).username == username
+
+    client.cookies.clear()
+    r = await client.get("/profile", headers={"Accept": "text/html"}, follow_redirects=False)
+    assert r.status_code == 307
+    assert r.headers["location"] == "/login"
+
+
+async def test_access_token_verification_is_cached(
+    client: httpx.AsyncClient,
+    bearer_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    token = bearer_headers["Authorization"].removeprefix("Bearer ")
+    _token_cache.pop(token)
+
+    decode_calls = 0
+    real_decode = auth_module._jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        nonlocal decode_calls
+        decode_calls += 1
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(auth_module._jwt, "decode", counting_decode)
+
+    for _ in range(20):
+        r = await client.get("/auth/users/me/", headers=bearer_headers)
+        assert r.status_code == 200
+    # Only the first request verifies the signature; the rest hit _token_cache.
+    assert decode_calls == 1
+
+
+def test_extract_token_prefers_access_token_and_skips_empty_values() -> None:
+    assert _extract_token(b"a=1; recipe_access_token=xyz; access_token=abc") == b"abc"
+    assert _extract_token(b"recipe_access_token=xyz;access_token=") == b"xyz"
+    assert _extract_token(b"my_access_token=nope; theme=dark") is None
@@ -2,53 +2,48 @@ from __future__ import annotations
 
 import threading
 import time
-import uuid
 
 from app.db.models import SavedRecipe as DBSavedRecipe
 from app.db.models import User as DBUser
-from app.db.session import SessionLocal
-from app.main import app
 from app.services import (
     _normalize_ingredients,
     generate_recipe_from_ingredients,
     get_empty_recipes,
 )
-from fastapi.testclient import TestClient
+import httpx
+import pytest
+from sqlalchemy.orm import Session
 
-client = TestClient(app)
+from tests.helpers import LOGIN_HEADERS, TokenResponse, assert_error
 
+pytestmark = pytest.mark.anyio
 
-def _unique_username() -> str:
-    return f"svcuser_{uuid.uuid4().hex[:8]}"
 
-
-def _unique_email() -> str:
-    return f"{uuid.uuid4().hex[:8]}@example.com"
-
-
-def _auth_context() -> tuple[dict[str, str], str]:
-    username = _unique_username()
-    email = _unique_email()
+async def _auth_context(
+    client: httpx.AsyncClient,
+    username: str = "svcuser",
+) -> tuple[dict[str, str], str]:
+    email = f"{username}@example.com"
     password = "ServiceTestPass123"  # Updated: meets password requirements (8+ chars, uppercase, lowercase, number)
 
-    signup = client.post(
+    signup = await client.post(
         "/auth/signup",
         json={"username": username, "email": email, "password": password},
     )
-    assert signup.status_code == 201, signup.text
+    assert signup.status_code == 201
 
-    login = client.post(
+    login = await client.post(
         "/auth/token",
         data={"username": username, "password": password},
-        headers={"Content-Type": "application/x-www-form-urlencoded"},
+        headers=LOGIN_HEADERS,
     )
-    assert login.status_code == 200, login.text
-    token = login.json()["access_token"]
+    assert login.status_code == 200
+    token = TokenResponse.validate_json(login.content).access_token
     return {"Authorization": f"Bearer {token}"}, username
 
 
-def _auth_headers() -> dict[str, str]:
-    headers, _ = _auth_context()
+async def _auth_headers(client: httpx.AsyncClient, username: str = "svcuser") -> dict[str, str]:
+    headers, _ = await _auth_context(client, username)
     return headers
 
 
@@ -56,99 +51,103 @@ def test_get_empty_recipes_returns_empty_list() -> None:
     assert get_empty_recipes() == []
 
 
-def test_generate_recipe_from_ingredients_creates_structured_recipe() -> None:
-    ingredients = ["tomato", "basil", "pasta"]
+LONG_INGREDIENT = "very-" + "long-" * 20 + "ingredient"
+
+
+# Mixed case, duplicates, and extra whitespace should be cleaned so only unique,
+# lowercase, trimmed ingredients remain in first-seen order.
+@pytest.mark.parametrize(
+    "raw, expected_names, expected_steps_min",
+    [
+        (["tomato", "basil", "pasta"], ["tomato", "basil", "pasta"], 1),
+        (["  tomato  ", "", "   ", "basil"], ["tomato", "basil"], 1),
+        (
+            ["  Tomato  ", "tomato", "BASIL", " basil ", "Pasta", "pasta  ", "Pasta"],
+            ["tomato", "basil", "pasta"],
+            1,
+        ),
+        (["egg", "milk", "flour"], ["egg", "milk", "flour"], 2),
+        # Should return a recipe without crashing on very long names
+        ([LONG_INGREDIENT, "salt"], [LONG_INGREDIENT, "salt"], 3),
+    ],
+)
+def test_generate_recipe_normalizes_input_and_returns_structured_recipe(
+    raw: list[str], expected_names: list[str], expected_steps_min: int
+) -> None:
+    assert _normalize_ingredients(raw) == expected_names
 
-    recipes = generate_recipe_from_ingredients(ingredients)
+    recipes = generate_recipe_from_ingredients(raw)
     assert len(recipes) == 1
     recipe = recipes[0]
-    assert recipe.title is not None
-    assert recipe.ingredients is not None
-    assert recipe.steps is not None
-
-
-def test_generate_recipe_ignores_empty_and_whitespace_only_items() -> None:
-    ingredients = ["  tomato  ", "", "   ", "basil"]
-    normalized = _normalize_ingredients(ingredients)
-    assert normalized == ["tomato", "basil"]
+    assert recipe.title
+    assert recipe.ingredients
+    # Steps should be non-empty strings
+    assert len(recipe.steps) >= expected_steps_min
+    assert all(isinstance(step, str) and step.strip() for step in recipe.steps)
 
 
 def test_generate_recipe_raises_on_no_valid_ingredients() -> None:
-    ingredients: list[str] = ["   ", ""]
+    with pytest.raises(ValueError, match="At least one ingredient is required"):
+        generate_recipe_from_ingredients(["   ", ""])
 
-    try:
-        generate_recipe_from_ingredients(ingredients)
-    except ValueError as exc:
-        assert "At least one ingredient is required" in str(exc)
-    else:
-        raise AssertionError("Expected ValueError for empty ingredients")
 
-
-def test_root_health_returns_200() -> None:
-    response = client.get("/")
+async def test_root_health_returns_200(client: httpx.AsyncClient) -> None:
+    response = await client.get("/")
     assert response.status_code == 200
 
 
-def test_list_recipes_endpoint_returns_empty_list() -> None:
-    response = client.get("/recipes")
+async def test_list_recipes_endpoint_returns_empty_list(client: httpx.AsyncClient) -> None:
+    response = await client.get("/recipes")
     assert response.status_code == 200
     assert response.json() == []
 
 
-def test_generate_recipe_endpoint_returns_422_on_invalid_input() -> None:
-    response = client.post("/recipes/generate", json={"ingredients": ["   ", ""]})
-    assert response.status_code == 422
-    body = response.json()
-    assert body.get("code") == "validation_error"
+async def test_generate_recipe_endpoint_returns_422_on_invalid_input(
+    client: httpx.AsyncClient,
+) -> None:
+    response = await client.post("/recipes/generate", json={"ingredients": ["   ", ""]})
+    assert_error(response, 422, "validation_error")
 
 
-def test_saved_recipes_endpoint_requires_auth() -> None:
-    response = client.get("/user/saved-recipes")
+async def test_saved_recipes_endpoint_requires_auth(client: httpx.AsyncClient) -> None:
+    response = await client.get("/user/saved-recipes")
     assert response.status_code == 401
 
 
-def test_saved_recipes_endpoint_returns_list_for_authenticated_user() -> None:
-    headers = _auth_headers()
-    response = client.get("/user/saved-recipes", headers=headers)
+@pytest.mark.fresh_db
+async def test_saved_recipes_endpoint_returns_list_for_authenticated_user(
+    client: httpx.AsyncClient,
+    bearer_headers: dict[str, str],
+) -> None:
+    response = await client.get("/user/saved-recipes", headers=bearer_headers)
     assert response.status_code == 200
     body = response.json()
     assert isinstance(body, list)
     assert body == []
 
 
-# Additional edge-case tests for ingredient normalization and recipe content
-def test_normalize_ingredients_removes_duplicates_case_insensitive_and_trims() -> None:
-    # Mixed case, duplicates, and extra whitespace should be cleaned so only unique,
-    # lowercase, trimmed ingredients remain in first-seen order.
-    raw = ["  Tomato  ", "tomato", "BASIL", " basil ", "Pasta", "pasta  ", "Pasta"]
-    normalized = _normalize_ingredients(raw)
-    assert normalized == ["tomato", "basil", "pasta"]
-
-
-
-def test_generate_recipe_steps_reference_ingredients_and_are_non_empty() -> None:
-    ingredients = ["egg", "milk", "flour"]
-    recipes = generate_recipe_from_ingredients(ingredients)
-    assert len(recipes) == 1
-    recipe = recipes[0]
-
-    # Steps should be non-empty strings
-    assert isinstance(recipe.steps, list)
-    assert len(recipe.steps) >= 2
-    for step in recipe.steps:
-        assert isinstance(step, str)
-        assert step.strip() != ""
-
+@pytest.mark.fresh_db
+async def test_saved_recipes_list_is_gzip_compressed_when_large(
+    client: httpx.AsyncClient,
+    bearer_headers: dict[str, str],
+) -> None:
+    save_resp = await client.post(
+        "/user/saved-recipes",
+        headers=bearer_headers,
+        json={
+            "title": "Big recipe",
+            "ingredients": [{"name": f"ingredient {i}"} for i in range(40)],
+            "steps": [f"step {i}: stir the pot gently" for i in range(40)],
+        },
+    )
+    assert save_resp.status_code == 201
 
-def test_generate_recipe_with_long_names_handles_length_gracefully() -> None:
-    long_name = "very-" + "long-" * 20 + "ingredient"
-    recipes = generate_recipe_from_ingredients([long_name, "salt"])
-    assert len(recipes) == 1
-    recipe = recipes[0]
-    # Should return a recipe without crashing and with non-empty ingredients/steps
-    assert recipe.ingredients is not None
-    assert len(recipe.ingredients) > 0
-    assert len(recipe.steps) >= 3
+    response = await client.get(
+        "/user/saved-recipes", headers={**bearer_headers, "Accept-Encoding": "gzip"}
+    )
+    assert response.status_code == 200
+    assert response.headers.get("content-encoding") == "gzip"
+    assert response.json()[0]["title"] == "Big recipe"
 
 
 def test_generate_recipe_with_gemini_falls_back_when_unavailable(monkeypatch) -> None:
@@ -166,52 +165,75 @@ def test_generate_recipe_with_gemini_falls_back_when_unavailable(monkeypatch) ->
     assert len(recipe.steps) >= 3
 
 
-def test_delete_saved_recipe_returns_204_with_empty_body() -> None:
-    headers = _auth_headers()
-
-    save_resp = client.post(
+@pytest.mark.fresh_db
+async def test_delete_saved_recipe_returns_204_with_empty_body(
+    client: httpx.AsyncClient,
+    bearer_headers: dict[str, str],
+) -> None:
+    save_resp = await client.post(
         "/user/saved-recipes",
-        headers=headers,
+        headers=bearer_headers,
         json={
             "title": "Delete me",
             "ingredients": [{"name": "tomato"}],
             "steps": ["slice", "serve"],
         },
     )
-    assert save_resp.status_code == 201, save_resp.text
-    saved_id = save_resp.json()["id"]
+    assert save_resp.status_code == 201
+    saved = save_resp.json()
+    saved_id = saved["id"]
+    assert saved["savedAt"]
 
-    delete_resp = client.delete(f"/user/saved-recipes/{saved_id}", headers=headers)
+    delete_resp = await client.delete(f"/user/saved-recipes/{saved_id}", headers=bearer_headers)
     assert delete_resp.status_code == 204
     assert delete_resp.text == ""
 
 
-def test_get_saved_recipe_returns_structured_error_for_invalid_saved_data() -> None:
-    headers, username = _auth_context()
-
-    db = SessionLocal()
-    try:
-        db_user = db.query(DBUser).filter(DBUser.username == username).first()
-        assert db_user is not None
-
-        invalid_saved = DBSavedRecipe(
-            user_id=db_user.id,
-            title="Corrupted recipe",
-            # Missing required Recipe fields -> should trigger backend validation failure.
-            recipe_data={"unexpected": "shape"},
-        )
-        db.add(invalid_saved)
-        db.commit()
-        db.refresh(invalid_saved)
-        saved_id = invalid_saved.id
-    finally:
-        db.close()
-
-    resp = client.get(f"/user/saved-recipes/{saved_id}", headers=headers)
-    assert resp.status_code == 500
-    body = resp.json()
-    assert body.get("code") == "invalid_saved_data"
-    assert "Saved recipe data is invalid" in body.get("message", "")
+@pytest.mark.fresh_db
+async def test_saved_recipe_is_not_visible_or_deletable_by_another_user(
+    client: httpx.AsyncClient,
+) -> None:
+    owner_headers = await _auth_headers(client, "owner")
+    other_headers = await _auth_headers(client, "other")
+
+    save_resp = await client.post(
+        "/user/saved-recipes",
+        headers=owner_headers,
+        json={"title": "Mine", "ingredients": [{"name": "egg"}], "steps": ["boil"]},
+    )
+    assert save_resp.status_code == 201
+    url = f"/user/saved-recipes/{save_resp.json()['id']}"
+
+    assert (await client.get(url, headers=other_headers)).status_code == 404
+    assert (await client.delete(url, headers=other_headers)).status_code == 404
+
+    # Still there for the owner; deleting twice is a 404 the second time.
+    assert (await client.get(url, headers=owner_headers)).status_code == 200
+    assert (await client.delete(url, headers=owner_headers)).status_code == 204
+    assert (await client.delete(url, headers=owner_headers)).status_code == 404
+
+
+async def test_get_saved_recipe_returns_structured_error_for_invalid_saved_data(
+    client: httpx.AsyncClient,
+    db_session: Session,
+) -> None:
+    headers, username = await _auth_context(client)
+
+    db_user = db_session.query(DBUser).filter(DBUser.username == username).first()
+    assert db_user is not None
+
+    invalid_saved = DBSavedRecipe(
+        user_id=db_user.id,
+        title="Corrupted recipe",
+        # Missing required Recipe fields -> should trigger backend validation failure.
+        recipe_data={"unexpected": "shape"},
+    )
+    db_session.add(invalid_saved)
+    db_session.commit()
+    saved_id = invalid_saved.id
+
+    resp = await client.get(f"/user/saved-recipes/{saved_id}", headers=headers)
+    assert_error(resp, 500, "invalid_saved_data", "Saved recipe data is invalid")
 
 
 def test_generate_recipe_runs_models_in_parallel_and_keeps_order(monkeypatch) -> None: